@@ -1,33 +1,103 @@
-from flask import Flask, render_template, request, jsonify
+from quart import Quart, render_template, request, jsonify
 import logging
 from pyrogram import Client
 from database.ia_filterdb import get_search_results
 from utils import get_size
 from info import CUSTOM_FILE_CAPTION
 from database.connections_mdb import active_connection
+import asyncio
+import contextlib
 import os
 
-app = Flask(__name__)
+app = Quart(__name__)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Pyrogram client
+# Pyrogram client credentials; the client itself is created on startup
 api_id = os.getenv("API_ID")
 api_hash = os.getenv("API_HASH")
 bot_token = os.getenv("BOT_TOKEN")
 
-bot = Client(
-    "web_bot",
-    api_id=api_id,
-    api_hash=api_hash,
-    bot_token=bot_token
-)
+bot = None
+_bot_start = None
+
+class _SafeDict(dict):
+    """Format mapping that renders unknown caption fields as empty strings."""
+    def __missing__(self, key):
+        return ''
+
+# Bound once at import; None when no custom caption is configured
+_caption_format = CUSTOM_FILE_CAPTION.format_map if CUSTOM_FILE_CAPTION else None
+
+def _format_caption(title, size, caption):
+    if _caption_format is not None:
+        try:
+            caption = _caption_format(_SafeDict(
+                file_name='' if title is None else title,
+                file_size='' if size is None else size,
+                file_caption='' if caption is None else caption
+            ))
+        except Exception as e:
+            logger.exception(e)
+    
+    if caption is None:
+        caption = f"{title}"
+    return caption
+
+def _format_result(file):
+    title = file['file_name']
+    size = get_size(file['file_size'])
+    return {
+        'title': title,
+        'file_id': file['file_id'],
+        'caption': _format_caption(title, size, file['caption']),
+        'size': size,
+        'description': f'Size: {size}'
+    }
+
+async def _start_bot():
+    try:
+        await bot.start()
+    except Exception as e:
+        logger.error(f"Pyrogram client failed to start: {str(e)}")
+
+@app.before_serving
+async def startup():
+    global bot, _bot_start
+    if not (api_id and api_hash and bot_token):
+        logger.warning("API_ID, API_HASH or BOT_TOKEN not set; Pyrogram client not started")
+        return
+    
+    # Built here so the client binds to the serving event loop, and started
+    # in the background so the web server does not wait on Telegram login
+    bot = Client(
+        "web_bot",
+        api_id=api_id,
+        api_hash=api_hash,
+        bot_token=bot_token
+    )
+    _bot_start = asyncio.create_task(_start_bot())
+
+@app.after_serving
+async def shutdown():
+    if bot is None:
+        return
+    
+    if not _bot_start.done():
+        _bot_start.cancel()
+        # Let the cancelled start unwind before inspecting the client state
+        with contextlib.suppress(asyncio.CancelledError):
+            await _bot_start
+    if bot.is_initialized:
+        await bot.stop()
+    elif bot.is_connected:
+        await bot.disconnect()
 
 @app.route('/')
-def index():
-    return render_template('index.html')
+async def index():
+    return await render_template('index.html')
 
 @app.route('/search', methods=['GET'])
 async def search():
@@ -50,33 +120,7 @@ async def search():
             max_results=50
         )
         
-        results = []
-        for file in files:
-            title = file['file_name']
-            size = get_size(file['file_size'])
-            f_caption = file['caption']
-            
-            if CUSTOM_FILE_CAPTION:
-                try:
-                    f_caption = CUSTOM_FILE_CAPTION.format(
-                        file_name='' if title is None else title,
-                        file_size='' if size is None else size,
-                        file_caption='' if f_caption is None else f_caption
-                    )
-                except Exception as e:
-                    logger.exception(e)
-                    f_caption = f_caption
-            
-            if f_caption is None:
-                f_caption = f"{file['file_name']}"
-            
-            results.append({
-                'title': title,
-                'file_id': file['file_id'],
-                'caption': f_caption,
-                'size': size,
-                'description': f'Size: {size}'
-            })
+        results = [_format_result(file) for file in files]
         
         return jsonify({
             'results': results,
@@ -88,5 +132,16 @@ async def search():
         logger.error(f"Search error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# Development server only. In production serve with a single Hypercorn worker:
+#     hypercorn -k uvloop bot:app
+# Every worker builds its own Client("web_bot") on the same session file, so
+# running more than one worker (--workers N) fails on the session file lock.
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # FLASK_DEBUG is still honoured for setups predating the Quart port
+    debug = "1" in (os.getenv("QUART_DEBUG"), os.getenv("FLASK_DEBUG"))
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    app.run(host='0.0.0.0', port=5000, debug=debug, use_reloader=debug)